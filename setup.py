@@ -0,0 +1,48 @@
+"""Build hooks for litesql-ha.
+
+The gRPC stubs in ``litesql_ha/_generated`` are generated from
+``proto/sql.proto`` at build time so that (de)serialization runs in the
+protobuf C extension instead of in Python.
+"""
+
+import os
+from importlib import resources
+
+from setuptools import setup
+from setuptools.command.build_py import build_py
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROTO_DIR = os.path.join(ROOT, "proto")
+SRC_DIR = os.path.join(ROOT, "src")
+GENERATED_PACKAGE = "litesql_ha/_generated"
+
+
+def generate_stubs() -> None:
+    """Run grpc_tools.protoc on proto/sql.proto."""
+    from grpc_tools import protoc
+
+    well_known_protos = str(resources.files("grpc_tools") / "_proto")
+    args = [
+        "grpc_tools.protoc",
+        f"-I{well_known_protos}",
+        # Map proto/ onto the package path so the generated *_grpc module
+        # imports sql_pb2 as litesql_ha._generated.sql_pb2.
+        f"-I{GENERATED_PACKAGE}={PROTO_DIR}",
+        f"--python_out={SRC_DIR}",
+        f"--pyi_out={SRC_DIR}",
+        f"--grpc_python_out={SRC_DIR}",
+        os.path.join(PROTO_DIR, "sql.proto"),
+    ]
+    if protoc.main(args) != 0:
+        raise RuntimeError("Failed to generate gRPC stubs from proto/sql.proto")
+
+
+class BuildPyWithStubs(build_py):
+    """build_py that generates the gRPC stubs first."""
+
+    def run(self) -> None:
+        generate_stubs()
+        super().run()
+
+
+setup(cmdclass={"build_py": BuildPyWithStubs})
@@ -1,7 +1,13 @@
 """LiteSQL HA - High-performance Python client for SQLite HA."""
 
-from .ha_client import HAClient, HAClientOptions, ExecutionResult
-from .ha_connection import HAConnection, HAConnectionOptions
+from .ha_client import (
+    BatchExecutionError,
+    ExecutionResult,
+    HAClient,
+    HAClientOptions,
+    SessionLostError,
+)
+from .ha_connection import BufferedExecution, HAConnection, HAConnectionOptions
 from .ha_datasource import HADataSource, HADataSourceOptions
 from .embedded_replicas import EmbeddedReplicasManager, ReplicaOptions
 
@@ -11,9 +17,12 @@ __all__ = [
     "HAClientOptions",
     "HAConnection",
     "HAConnectionOptions",
+    "BufferedExecution",
     "HADataSource",
     "HADataSourceOptions",
     "EmbeddedReplicasManager",
     "ReplicaOptions",
     "ExecutionResult",
+    "BatchExecutionError",
+    "SessionLostError",
 ]
@@ -1,10 +1,10 @@
 """Converter utilities for protobuf Any type conversion."""
 
-from datetime import datetime
-from typing import Any, Optional
+import struct
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, cast
 
 from google.protobuf.any_pb2 import Any as AnyProto
-from google.protobuf.empty_pb2 import Empty
 from google.protobuf.wrappers_pb2 import (
     BoolValue,
     BytesValue,
@@ -21,108 +21,194 @@ from google.protobuf.timestamp_pb2 import Timestamp
 TYPE_URL_PREFIX = "type.googleapis.com/google.protobuf."
 
 
-def to_any(value: Any) -> AnyProto:
-    """Convert a Python value to protobuf Any format."""
-    any_proto = AnyProto()
+_EMPTY_URL = f"{TYPE_URL_PREFIX}Empty"
+_STRING_URL = f"{TYPE_URL_PREFIX}StringValue"
+_BOOL_URL = f"{TYPE_URL_PREFIX}BoolValue"
+_INT32_URL = f"{TYPE_URL_PREFIX}Int32Value"
+_INT64_URL = f"{TYPE_URL_PREFIX}Int64Value"
+_DOUBLE_URL = f"{TYPE_URL_PREFIX}DoubleValue"
+_TIMESTAMP_URL = f"{TYPE_URL_PREFIX}Timestamp"
+_BYTES_URL = f"{TYPE_URL_PREFIX}BytesValue"
 
-    if value is None:
-        any_proto.Pack(Empty())
-        return any_proto
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
-    if isinstance(value, str):
-        any_proto.Pack(StringValue(value=value))
-        return any_proto
+# Serialized BoolValue payloads (proto3 omits the default, so False is empty).
+_TRUE_PAYLOAD = BoolValue(value=True).SerializeToString()
+_FALSE_PAYLOAD = b""
 
-    if isinstance(value, bool):
-        any_proto.Pack(BoolValue(value=value))
-        return any_proto
+# The packers below build the Any from a precomputed type_url and the
+# serialized wrapper, which is what Any.Pack does minus the per-call
+# descriptor lookup and type_url formatting.
 
-    if isinstance(value, int):
-        if -2147483648 <= value <= 2147483647:
-            any_proto.Pack(Int32Value(value=value))
-        else:
-            any_proto.Pack(Int64Value(value=value))
-        return any_proto
 
-    if isinstance(value, float):
-        any_proto.Pack(DoubleValue(value=value))
-        return any_proto
+def _pack_none(value: None) -> AnyProto:
+    return AnyProto(type_url=_EMPTY_URL)
 
-    if isinstance(value, datetime):
-        ts = Timestamp()
-        ts.FromDatetime(value)
-        any_proto.Pack(ts)
-        return any_proto
 
-    if isinstance(value, bytes):
-        any_proto.Pack(BytesValue(value=value))
-        return any_proto
+def _pack_string(value: str) -> AnyProto:
+    return AnyProto(type_url=_STRING_URL, value=StringValue(value=value).SerializeToString())
 
-    if isinstance(value, bytearray):
-        any_proto.Pack(BytesValue(value=bytes(value)))
-        return any_proto
 
-    raise TypeError(f"Unsupported type: {type(value)}")
+def _pack_bool(value: bool) -> AnyProto:
+    return AnyProto(type_url=_BOOL_URL, value=_TRUE_PAYLOAD if value else _FALSE_PAYLOAD)
 
 
-def from_any(any_proto: AnyProto) -> Optional[Any]:
-    """Convert a protobuf Any value to Python value."""
-    if not any_proto or not any_proto.type_url:
-        return None
+def _pack_int(value: int) -> AnyProto:
+    if -2147483648 <= value <= 2147483647:
+        return AnyProto(type_url=_INT32_URL, value=Int32Value(value=value).SerializeToString())
+    return AnyProto(type_url=_INT64_URL, value=Int64Value(value=value).SerializeToString())
 
-    type_url = any_proto.type_url
 
-    if type_url == f"{TYPE_URL_PREFIX}Empty":
-        return None
+def _pack_double(value: float) -> AnyProto:
+    return AnyProto(type_url=_DOUBLE_URL, value=DoubleValue(value=value).SerializeToString())
 
-    if type_url == f"{TYPE_URL_PREFIX}StringValue":
-        wrapper = StringValue()
-        any_proto.Unpack(wrapper)
-        return wrapper.value
 
-    if type_url == f"{TYPE_URL_PREFIX}DoubleValue":
-        wrapper = DoubleValue()
-        any_proto.Unpack(wrapper)
-        return wrapper.value
+def _pack_timestamp(value: datetime) -> AnyProto:
+    # Same result as Timestamp.FromDatetime: naive datetimes (no tzinfo, or
+    # a tzinfo whose utcoffset() is None) are taken as UTC.
+    delta = value - (_EPOCH if value.utcoffset() is None else _EPOCH_UTC)
+    ts = Timestamp(
+        seconds=delta.days * 86400 + delta.seconds,
+        nanos=value.microsecond * 1000,
+    )
+    return AnyProto(type_url=_TIMESTAMP_URL, value=ts.SerializeToString())
 
-    if type_url == f"{TYPE_URL_PREFIX}FloatValue":
-        wrapper = FloatValue()
-        any_proto.Unpack(wrapper)
-        return wrapper.value
 
-    if type_url == f"{TYPE_URL_PREFIX}Int64Value":
-        wrapper = Int64Value()
-        any_proto.Unpack(wrapper)
-        return wrapper.value
+def _varint(value: int) -> bytes:
+    """Encode a non-negative int as a protobuf varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
 
-    if type_url == f"{TYPE_URL_PREFIX}Int32Value":
-        wrapper = Int32Value()
-        any_proto.Unpack(wrapper)
-        return wrapper.value
 
-    if type_url == f"{TYPE_URL_PREFIX}UInt64Value":
-        wrapper = UInt64Value()
-        any_proto.Unpack(wrapper)
-        return wrapper.value
+def _pack_bytes(value: bytes) -> AnyProto:
+    # BytesValue is field 1 (tag 0x0A), length-delimited. Writing the header
+    # directly copies the payload once instead of through a wrapper message.
+    if not value:
+        return AnyProto(type_url=_BYTES_URL)
+    return AnyProto(type_url=_BYTES_URL, value=b"\x0a" + _varint(len(value)) + value)
 
-    if type_url == f"{TYPE_URL_PREFIX}UInt32Value":
-        wrapper = UInt32Value()
-        any_proto.Unpack(wrapper)
-        return wrapper.value
 
-    if type_url == f"{TYPE_URL_PREFIX}BoolValue":
-        wrapper = BoolValue()
-        any_proto.Unpack(wrapper)
+# Exact-type dispatch for to_any. Keyed on type(value), so bool never
+# falls into the int packer; subclasses are added by to_any on first use.
+_PACKERS: Dict[type, Callable[[Any], AnyProto]] = {
+    type(None): _pack_none,
+    str: _pack_string,
+    bool: _pack_bool,
+    int: _pack_int,
+    float: _pack_double,
+    datetime: _pack_timestamp,
+    bytes: _pack_bytes,
+    # bytes + bytearray yields bytes, so no separate bytes() copy is needed.
+    bytearray: _pack_bytes,
+}
+
+
+def _resolve_packer(value_type: type) -> Optional[Callable[[Any], AnyProto]]:
+    """Find the packer for a subclass of a supported type."""
+    # bool must be checked before int since it subclasses int.
+    for base in (str, bool, int, float, datetime, bytes, bytearray):
+        if issubclass(value_type, base):
+            return _PACKERS[base]
+    return None
+
+
+def to_any(value: Any) -> AnyProto:
+    """Convert a Python value to protobuf Any format."""
+    value_type = type(value)
+    packer = _PACKERS.get(value_type)
+    if packer is None:
+        # Subclasses (IntEnum, str enums, ...) are resolved once and cached.
+        packer = _resolve_packer(value_type)
+        if packer is None:
+            raise TypeError(f"Unsupported type: {value_type}")
+        _PACKERS[value_type] = packer
+    return packer(value)
+
+
+def _unpacker(wrapper_cls: type) -> Callable[[AnyProto], Any]:
+    def unpack(any_proto: AnyProto) -> Any:
+        wrapper = wrapper_cls()
+        wrapper.ParseFromString(any_proto.value)
         return wrapper.value
 
-    if type_url == f"{TYPE_URL_PREFIX}Timestamp":
-        ts = Timestamp()
-        any_proto.Unpack(ts)
-        return ts.ToDatetime()
+    return unpack
 
-    if type_url == f"{TYPE_URL_PREFIX}BytesValue":
-        wrapper = BytesValue()
-        any_proto.Unpack(wrapper)
+
+def _unpack_empty(any_proto: AnyProto) -> None:
+    return None
+
+
+def _unpack_string(any_proto: AnyProto) -> str:
+    data = any_proto.value
+    # Short values are a single field: tag 0x0a, 1-byte length, payload.
+    if len(data) > 1 and data[0] == 0x0A and data[1] == len(data) - 2:
+        return cast(str, data[2:].decode("utf-8"))
+    wrapper = StringValue()
+    wrapper.ParseFromString(data)
+    return cast(str, wrapper.value)
+
+
+def _unpack_bytes(any_proto: AnyProto) -> bytes:
+    data = any_proto.value
+    if len(data) > 1 and data[0] == 0x0A and data[1] == len(data) - 2:
+        return cast(bytes, data[2:])
+    wrapper = BytesValue()
+    wrapper.ParseFromString(data)
+    return cast(bytes, wrapper.value)
+
+
+def _fixed_width_unpacker(
+    wrapper_cls: type, tag: int, fmt: struct.Struct
+) -> Callable[[AnyProto], Any]:
+    size = 1 + fmt.size
+
+    def unpack(any_proto: AnyProto) -> Any:
+        data = any_proto.value
+        # A set value is the tag byte followed by the little-endian payload;
+        # the default (0.0) is encoded as an empty message.
+        if len(data) == size and data[0] == tag:
+            return fmt.unpack_from(data, 1)[0]
+        if not data:
+            return 0.0
+        wrapper = wrapper_cls()
+        wrapper.ParseFromString(data)
         return wrapper.value
 
-    raise ValueError(f"Unsupported type: {type_url}")
+    return unpack
+
+
+def _unpack_timestamp(any_proto: AnyProto) -> datetime:
+    ts = Timestamp()
+    ts.ParseFromString(any_proto.value)
+    return cast(datetime, ts.ToDatetime())
+
+
+_UNPACKERS: Dict[str, Callable[[AnyProto], Any]] = {
+    f"{TYPE_URL_PREFIX}Empty": _unpack_empty,
+    f"{TYPE_URL_PREFIX}StringValue": _unpack_string,
+    f"{TYPE_URL_PREFIX}DoubleValue": _fixed_width_unpacker(DoubleValue, 0x09, struct.Struct("<d")),
+    f"{TYPE_URL_PREFIX}FloatValue": _fixed_width_unpacker(FloatValue, 0x0D, struct.Struct("<f")),
+    f"{TYPE_URL_PREFIX}Int64Value": _unpacker(Int64Value),
+    f"{TYPE_URL_PREFIX}Int32Value": _unpacker(Int32Value),
+    f"{TYPE_URL_PREFIX}UInt64Value": _unpacker(UInt64Value),
+    f"{TYPE_URL_PREFIX}UInt32Value": _unpacker(UInt32Value),
+    f"{TYPE_URL_PREFIX}BoolValue": _unpacker(BoolValue),
+    f"{TYPE_URL_PREFIX}Timestamp": _unpack_timestamp,
+    f"{TYPE_URL_PREFIX}BytesValue": _unpack_bytes,
+}
+
+
+def from_any(any_proto: AnyProto) -> Optional[Any]:
+    """Convert a protobuf Any value to Python value."""
+    if not any_proto or not any_proto.type_url:
+        return None
+
+    unpacker = _UNPACKERS.get(any_proto.type_url)
+    if unpacker is None:
+        raise ValueError(f"Unsupported type: {any_proto.type_url}")
+    return unpacker(any_proto)
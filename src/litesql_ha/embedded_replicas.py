@@ -1,10 +1,12 @@
 """Embedded replicas manager for local SQLite replicas with NATS synchronization."""
 
 import asyncio
+import json
 import os
 import sqlite3
-from dataclasses import dataclass
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, cast
 
 import nats
 from nats.js import JetStreamContext
@@ -27,6 +29,10 @@ class ReplicaConnection:
     dsn: str
     conn: sqlite3.Connection
     txseq: int = 0
+    # SQLite allows a single writer, so each replica gets one worker thread.
+    executor: ThreadPoolExecutor = field(
+        default_factory=lambda: ThreadPoolExecutor(max_workers=1)
+    )
 
 
 class EmbeddedReplicasManager:
@@ -40,6 +46,11 @@ class EmbeddedReplicasManager:
     _instance: Optional["EmbeddedReplicasManager"] = None
     _lock = asyncio.Lock()
 
+    # Idle read-only connections kept per replica.
+    RO_POOL_SIZE = 8
+    # Lets read-only connections map the replica file instead of pread-ing pages.
+    RO_MMAP_SIZE = 256 * 1024 * 1024
+
     def __new__(cls):
         """Ensure singleton pattern."""
         if cls._instance is None:
@@ -56,7 +67,8 @@ class EmbeddedReplicasManager:
         self._nats_conn: Optional[nats.NATS] = None
         self._jetstream: Optional[JetStreamContext] = None
         self._subscriptions: Dict[str, any] = {}
-        self._update_task: Optional[asyncio.Task] = None
+        self._ro_pools: Dict[str, List[sqlite3.Connection]] = {}
+        self._ro_leases: Dict[sqlite3.Connection, str] = {}
         self._running = False
         self._initialized = True
 
@@ -82,45 +94,50 @@ class EmbeddedReplicasManager:
 
         self._nats_conn = await nats.connect(nats_url)
         self._jetstream = self._nats_conn.jetstream()
+        self._running = True
 
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-
-            if not os.path.isfile(file_path) or filename in self._replicas:
-                continue
+        loop = asyncio.get_running_loop()
+        # Hidden files, e.g. in-progress downloads, are never replicas.
+        filenames = [
+            name
+            for name in os.listdir(directory)
+            if not name.startswith(".") and name not in self._replicas
+        ]
+        replicas = await asyncio.gather(
+            *(
+                loop.run_in_executor(None, self._open_replica, os.path.join(directory, name))
+                for name in filenames
+            )
+        )
 
-            if not self._is_sqlite_file(file_path):
+        for filename, replica in zip(filenames, replicas):
+            if replica is None:
                 continue
 
-            try:
-                conn = sqlite3.connect(file_path, check_same_thread=False)
-                conn.execute("PRAGMA journal_mode = WAL")
-                conn.execute("PRAGMA temp_store = MEMORY")
-                conn.execute("PRAGMA busy_timeout = 5000")
-
-                txseq = 0
-                try:
-                    cursor = conn.execute(
-                        "SELECT received_seq FROM ha_stats ORDER BY updated_at DESC LIMIT 1"
-                    )
-                    row = cursor.fetchone()
-                    if row:
-                        txseq = row[0]
-                except sqlite3.OperationalError:
-                    pass
-
-                self._replicas[filename] = ReplicaConnection(
-                    dsn=file_path,
-                    conn=conn,
-                    txseq=txseq,
-                )
+            self._replicas[filename] = replica
+            await self._subscribe_to_replication(filename, stream, durable)
 
-                await self._subscribe_to_replication(filename, stream, durable)
+    def _open_replica(self, file_path: str) -> Optional[ReplicaConnection]:
+        """Open a replica file, or return None if it is not a SQLite database."""
+        if not self._is_sqlite_file(file_path):
+            return None
 
-            except Exception as e:
-                print(f"Failed to load replica {filename}: {e}")
+        try:
+            conn = sqlite3.connect(file_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.execute("PRAGMA busy_timeout = 5000")
+
+            return ReplicaConnection(
+                dsn=file_path,
+                conn=conn,
+                txseq=self._read_txseq(conn) or 0,
+            )
 
-        self._start_txseq_updater()
+        except Exception as e:
+            print(f"Failed to load replica {os.path.basename(file_path)}: {e}")
+            return None
 
     async def _subscribe_to_replication(
         self,
@@ -149,64 +166,86 @@ class EmbeddedReplicasManager:
 
     async def _process_messages(self, replica_name: str, subscription) -> None:
         """Process replication messages for a replica."""
+        loop = asyncio.get_running_loop()
         while self._running:
             try:
                 messages = await subscription.fetch(10, timeout=5)
-                for msg in messages:
-                    await self._apply_replication_message(replica_name, msg.data)
-                    await msg.ack()
+                replica = self._replicas.get(replica_name)
+                if replica:
+                    batch = [self._decode_replication_message(msg.data) for msg in messages]
+                    await loop.run_in_executor(
+                        replica.executor, self._apply_replication_batch, replica, batch
+                    )
+                await asyncio.gather(*(msg.ack() for msg in messages))
             except asyncio.TimeoutError:
                 continue
             except Exception as e:
                 print(f"Error processing messages for {replica_name}: {e}")
                 await asyncio.sleep(1)
 
-    async def _apply_replication_message(
+    def _decode_replication_message(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """Decode a replication message."""
+        try:
+            return cast(Dict[str, Any], json.loads(data))
+        except Exception as e:
+            print(f"Error decoding replication message: {e}")
+            return None
+
+    def _apply_replication_batch(
         self,
-        replica_name: str,
-        data: bytes,
+        replica: ReplicaConnection,
+        batch: List[Optional[dict]],
     ) -> None:
-        """Apply a replication message to a replica."""
-        replica = self._replicas.get(replica_name)
-        if not replica:
-            return
+        """
+        Apply a batch of replication messages in a single transaction.
 
+        Runs on the replica's executor thread.
+        """
+        txseq = None
+        replica.conn.execute("BEGIN IMMEDIATE")
         try:
-            import json
-            message = json.loads(data.decode("utf-8"))
+            for message in batch:
+                if message is None:
+                    continue
+                message_txseq = self._apply_replication_message(replica, message)
+                if message_txseq is not None:
+                    txseq = message_txseq
+            if txseq is None:
+                # No txseq in the messages; fall back to what ha_stats recorded.
+                txseq = self._read_txseq(replica.conn)
+            replica.conn.commit()
+        except Exception:
+            replica.conn.rollback()
+            raise
+
+        if txseq is not None:
+            replica.txseq = max(replica.txseq, txseq)
 
+    def _apply_replication_message(
+        self,
+        replica: ReplicaConnection,
+        message: dict,
+    ) -> Optional[int]:
+        """Apply a replication message to a replica, returning its txseq."""
+        try:
             if "sql" in message:
                 replica.conn.execute(message["sql"])
-                replica.conn.commit()
 
-            if "txseq" in message:
-                replica.txseq = message["txseq"]
+            return message.get("txseq")
 
         except Exception as e:
             print(f"Error applying replication message: {e}")
+            return None
 
-    def _start_txseq_updater(self) -> None:
-        """Start the background task to update txseq."""
-        if self._update_task is not None:
-            return
-
-        self._running = True
-
-        async def update_loop():
-            while self._running:
-                await asyncio.sleep(5)
-                for name, replica in self._replicas.items():
-                    try:
-                        cursor = replica.conn.execute(
-                            "SELECT received_seq FROM ha_stats ORDER BY updated_at DESC LIMIT 1"
-                        )
-                        row = cursor.fetchone()
-                        if row:
-                            replica.txseq = row[0]
-                    except Exception:
-                        pass
-
-        self._update_task = asyncio.create_task(update_loop())
+    def _read_txseq(self, conn: sqlite3.Connection) -> Optional[int]:
+        """Read the last received txseq recorded in a replica's ha_stats table."""
+        try:
+            row = conn.execute(
+                "SELECT received_seq FROM ha_stats ORDER BY updated_at DESC LIMIT 1"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
 
     def get_replica(self, db_name: str) -> Optional[ReplicaConnection]:
         """
@@ -224,21 +263,50 @@ class EmbeddedReplicasManager:
 
     def create_connection(self, db_name: str) -> Optional[sqlite3.Connection]:
         """
-        Create a new read-only connection to a replica.
+        Get a read-only connection to a replica.
+
+        Connections are taken from a per-replica pool when one is idle and
+        should be handed back with release_connection() when done.
 
         Args:
             db_name: The database name.
 
         Returns:
-            A new SQLite connection or None.
+            A SQLite connection or None.
         """
         replica = self.get_replica(db_name)
         if not replica:
             return None
 
-        conn = sqlite3.connect(f"file:{replica.dsn}?mode=ro", uri=True, check_same_thread=False)
+        pool = self._ro_pools.get(replica.dsn)
+        if pool:
+            conn = pool.pop()
+        else:
+            conn = sqlite3.connect(
+                f"file:{replica.dsn}?mode=ro", uri=True, check_same_thread=False
+            )
+            conn.execute("PRAGMA query_only = 1")
+            conn.execute(f"PRAGMA mmap_size = {self.RO_MMAP_SIZE}")
+
+        self._ro_leases[conn] = replica.dsn
         return conn
 
+    def release_connection(self, conn: sqlite3.Connection) -> None:
+        """
+        Return a connection obtained from create_connection() to its pool.
+
+        Args:
+            conn: The connection to release.
+        """
+        dsn = self._ro_leases.pop(conn, None)
+        pool = self._ro_pools.setdefault(dsn, []) if dsn else None
+
+        if pool is None or len(pool) >= self.RO_POOL_SIZE:
+            conn.close()
+            return
+
+        pool.append(conn)
+
     def is_replica_updated(self, db_name: str, txseq: int) -> bool:
         """
         Check if a replica is up to date with the given txseq.
@@ -257,34 +325,43 @@ class EmbeddedReplicasManager:
 
     def _is_sqlite_file(self, file_path: str) -> bool:
         """Check if a file is a SQLite database."""
+        # A single open+read replaces the isfile/getsize stats: directories
+        # and FIFOs fail the (non-blocking) read, and files shorter than the
+        # 100-byte SQLite header come back short.
+        flags = os.O_RDONLY | getattr(os, "O_NONBLOCK", 0) | getattr(os, "O_BINARY", 0)
         try:
-            if os.path.getsize(file_path) < 100:
-                return False
+            fd = os.open(file_path, flags)
+        except OSError:
+            return False
 
-            with open(file_path, "rb") as f:
-                header = f.read(16)
-                return header.startswith(b"SQLite format 3")
-        except Exception:
+        try:
+            header = os.read(fd, 100)
+        except OSError:
             return False
+        finally:
+            os.close(fd)
+
+        return len(header) == 100 and header.startswith(b"SQLite format 3")
 
     async def close(self) -> None:
         """Stop all replicas and close connections."""
         self._running = False
 
-        if self._update_task:
-            self._update_task.cancel()
-            try:
-                await self._update_task
-            except asyncio.CancelledError:
-                pass
-            self._update_task = None
-
         for sub in self._subscriptions.values():
             await sub.unsubscribe()
         self._subscriptions.clear()
 
+        for pool in self._ro_pools.values():
+            for conn in pool:
+                conn.close()
+        self._ro_pools.clear()
+        self._ro_leases.clear()
+
+        loop = asyncio.get_running_loop()
         for replica in self._replicas.values():
-            replica.conn.close()
+            # Queued behind any batch still running on the replica's thread.
+            await loop.run_in_executor(replica.executor, replica.conn.close)
+            replica.executor.shutdown()
         self._replicas.clear()
 
         if self._nats_conn:
@@ -1,17 +1,32 @@
 """HA Client for communicating with the SQLite HA server via gRPC."""
 
 import asyncio
+import itertools
 import os
+import time
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
 
 import grpc
-from google.protobuf.any_pb2 import Any as AnyProto
 from google.protobuf.empty_pb2 import Empty
 
+from . import _generated
 from .client.converter import from_any, to_any
 
+# Sized for large result sets and replica downloads, with keepalives so dead
+# long-lived connections are noticed instead of hanging the next query. The
+# send limit is left at gRPC's default (unlimited). The keepalive interval
+# stays at the 5 minute minimum that grpc-go servers enforce by default;
+# more frequent pings get the connection closed.
+CHANNEL_OPTIONS: List[Tuple[str, int]] = [
+    ("grpc.max_receive_message_length", 64 * 1024 * 1024),
+    ("grpc.http2.initial_window_size", 8 * 1024 * 1024),
+    ("grpc.http2.initial_connection_window_size", 16 * 1024 * 1024),
+    ("grpc.keepalive_time_ms", 300_000),
+    ("grpc.keepalive_timeout_ms", 20_000),
+]
+
 
 @dataclass
 class HAClientOptions:
@@ -21,53 +36,69 @@ class HAClientOptions:
     token: Optional[str] = None
     enable_ssl: bool = False
     timeout: int = 30
+    pool_size: int = 4
+    # Keep every query on the first channel's persistent stream, waiting for
+    # it when busy, and raise SessionLostError rather than moving to a new
+    # stream when it is lost. Server-side session state (open transactions,
+    # PRAGMAs) lives on that stream; HAConnection sets this.
+    session: bool = False
 
 
 @dataclass
 class ExecutionResult:
-    """Result of a query execution."""
+    """
+    Result of a query execution.
+
+    Rows are tuples, as sqlite3 returns them, whether the query was answered
+    by the server or by an embedded replica.
+    """
 
     columns: List[str] = field(default_factory=list)
-    rows: List[List[Any]] = field(default_factory=list)
+    rows: List[Tuple[Any, ...]] = field(default_factory=list)
     rows_affected: int = 0
 
 
-class QueryType:
-    """Query type enumeration."""
+class BatchExecutionError(Exception):
+    """
+    Raised when one or more statements of a batch fail.
 
-    UNSPECIFIED = 0
-    EXEC_QUERY = 1
-    EXEC_UPDATE = 2
+    Batches are not atomic: every statement was sent and executed, so the
+    statements that succeeded have taken effect.
 
+    Attributes:
+        index: Position of the first failed statement.
+        rows_affected: Rows affected by each statement, None where it failed.
+    """
 
-@dataclass
-class NamedValue:
-    """Named parameter value."""
+    def __init__(self, message: str, index: int, rows_affected: List[Optional[int]]):
+        """Initialize the error."""
+        super().__init__(message)
+        self.index = index
+        self.rows_affected = rows_affected
 
-    name: Optional[str] = None
-    ordinal: int = 0
-    value: Optional[AnyProto] = None
 
+class SessionLostError(Exception):
+    """
+    Raised when a session client's Query stream was lost.
 
-@dataclass
-class QueryRequest:
-    """Query request message."""
+    The server-side session went with it, so an open transaction was rolled
+    back and session PRAGMAs were reset. The next query starts a new session.
+    """
 
-    replication_id: str = ""
-    sql: str = ""
-    type: int = QueryType.UNSPECIFIED
-    params: List[NamedValue] = field(default_factory=list)
 
+class QueryType:
+    """Query type enumeration."""
 
-@dataclass
-class QueryResponse:
-    """Query response message."""
+    UNSPECIFIED = _generated.QueryType.QUERY_TYPE_UNSPECIFIED
+    EXEC_QUERY = _generated.QueryType.QUERY_TYPE_EXEC_QUERY
+    EXEC_UPDATE = _generated.QueryType.QUERY_TYPE_EXEC_UPDATE
 
-    columns: List[str] = field(default_factory=list)
-    rows: List[List[AnyProto]] = field(default_factory=list)
-    rows_affected: int = 0
-    txseq: int = 0
-    error: str = ""
+
+def _decode_rows(rows: Iterable[Any]) -> List[Tuple[Any, ...]]:
+    """Convert result-set rows of Any values to tuples of Python values."""
+    # Local binding: map() calls it once per cell.
+    _from_any = from_any
+    return [tuple(map(_from_any, row.values)) for row in rows]
 
 
 class HAClient:
@@ -80,89 +111,239 @@ class HAClient:
         client.close()
     """
 
-    def __init__(self, options: HAClientOptions):
-        """Initialize the HA client."""
-        url = options.url.replace("litesql://", "http://")
-        parsed = urlparse(url)
+    def __init__(
+        self,
+        options: HAClientOptions,
+        channels: Optional[Sequence[grpc.aio.Channel]] = None,
+    ):
+        """
+        Initialize the HA client.
+
+        Args:
+            options: Client configuration options.
+            channels: Existing channels to send RPCs over instead of opening
+                a new pool. They are not closed by close().
+        """
+        parsed = urlparse(options.url)
 
         self._replication_id = parsed.path.lstrip("/")
         self._timeout = options.timeout
         self._token = options.token or ""
         self._enable_ssl = options.enable_ssl
         self._txseq = 0
+        self._last_ok = 0.0
+        self._session = options.session
+        self._session_lost = False
+        self._session_generation = 0
 
         host = parsed.hostname or "localhost"
+        # parsed.port raises ValueError for a non-numeric or out-of-range port.
         port = parsed.port or 8080
-        address = f"{host}:{port}"
-
-        if options.enable_ssl:
-            self._channel = grpc.aio.secure_channel(address, grpc.ssl_channel_credentials())
+        address = f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+        # A local subchannel pool per channel keeps gRPC from collapsing the
+        # pool onto one shared TCP connection.
+        channel_options = [*CHANNEL_OPTIONS, ("grpc.use_local_subchannel_pool", 1)]
+        self._owns_channels = not channels
+        if channels:
+            self._channels = list(channels)
+        elif options.enable_ssl:
+            credentials = grpc.ssl_channel_credentials()
+            self._channels = [
+                grpc.aio.secure_channel(address, credentials, options=channel_options)
+                for _ in range(max(1, options.pool_size))
+            ]
         else:
-            self._channel = grpc.aio.insecure_channel(address)
-
-        self._stub = None
-        self._query_stream: Optional[grpc.aio.StreamStreamCall] = None
-        self._response_queue: asyncio.Queue[QueryResponse] = asyncio.Queue()
-
-    async def _ensure_stub(self):
-        """Ensure the gRPC stub is initialized."""
-        if self._stub is None:
-            from . import _generated
-            self._stub = _generated.DatabaseServiceStub(self._channel)
+            self._channels = [
+                grpc.aio.insecure_channel(address, options=channel_options)
+                for _ in range(max(1, options.pool_size))
+            ]
+        pool_size = len(self._channels)
+
+        self._stubs = [_generated.DatabaseServiceStub(channel) for channel in self._channels]
+        self._next_channel = itertools.count()
+        self._metadata: Tuple[Tuple[str, str], ...] = (
+            (("authorization", f"Bearer {self._token}"),) if self._token else ()
+        )
+        # One long-lived Query stream per channel, opened on first use. The
+        # lock keeps a single request in flight so responses pair up in order.
+        self._query_streams: List[Optional[grpc.aio.StreamStreamCall]] = [None] * pool_size
+        self._query_locks = [asyncio.Lock() for _ in range(pool_size)]
+
+    def _stub(self) -> _generated.DatabaseServiceStub:
+        """Pick the stub for the next RPC, round-robin across the channel pool."""
+        return self._stubs[next(self._next_channel) % len(self._stubs)]
+
+    def _build_request(
+        self,
+        sql: str,
+        parameters: Optional[Dict[Union[str, int], Any]],
+        query_type: _generated.QueryType,
+    ) -> _generated.QueryRequest:
+        """Build a QueryRequest message."""
+        request = _generated.QueryRequest(
+            replication_id=self._replication_id,
+            sql=sql,
+            type=query_type,
+        )
 
-    async def _get_metadata(self) -> List[Tuple[str, str]]:
-        """Get gRPC metadata including authorization."""
-        metadata = []
-        if self._token:
-            metadata.append(("authorization", f"Bearer {self._token}"))
-        return metadata
+        if parameters:
+            add = request.params.add
+            if all(type(key) is int for key in parameters):
+                # Positional parameters: the key is the ordinal, no name needed.
+                for key, value in parameters.items():
+                    add(ordinal=key, value=to_any(value))
+            else:
+                for ordinal, (key, value) in enumerate(parameters.items(), 1):
+                    if isinstance(key, int):
+                        add(ordinal=key, value=to_any(value))
+                    else:
+                        add(ordinal=ordinal, name=str(key), value=to_any(value))
+
+        return request
 
     async def _send_query(
         self,
         sql: str,
         parameters: Optional[Dict[Union[str, int], Any]],
-        query_type: int,
-    ) -> QueryResponse:
+        query_type: _generated.QueryType,
+    ) -> _generated.QueryResponse:
         """Send a query request and wait for response."""
-        await self._ensure_stub()
-
-        params = []
-        if parameters:
-            ordinal = 1
-            for key, value in parameters.items():
-                nv = {
-                    "ordinal": key if isinstance(key, int) else ordinal,
-                    "value": to_any(value),
-                }
-                if not isinstance(key, int):
-                    nv["name"] = str(key)
-                params.append(nv)
-                ordinal += 1
-
-        request = {
-            "replication_id": self._replication_id,
-            "sql": sql,
-            "type": query_type,
-            "params": params,
-        }
-
-        metadata = await self._get_metadata()
+        request = self._build_request(sql, parameters, query_type)
+        responses = await self._send_requests([request])
+        return responses[0]
 
+    async def _send_requests(
+        self,
+        requests: List[_generated.QueryRequest],
+    ) -> List[_generated.QueryResponse]:
+        """Send requests over a Query stream and read one response per request."""
+        index = 0 if self._session else self._pick_channel()
+        lock = self._query_locks[index]
         try:
-            async def request_iterator():
-                yield request
-
-            responses = self._stub.Query(request_iterator(), metadata=metadata)
-
-            async for response in responses:
-                if response.txseq > 0:
-                    self._txseq = response.txseq
-                return response
+            if lock.locked() and not self._session:
+                # Every persistent stream is busy; a stream of its own keeps
+                # this request from queueing behind a slow one.
+                responses = await self._send_on_new_stream(index, requests)
+            else:
+                async with lock:
+                    responses = await self._send_on_query_stream(index, requests)
+        except BaseException as e:
+            self._last_ok = 0.0
+            if isinstance(e, grpc.RpcError):
+                raise Exception(f"gRPC error: {e.code()}: {e.details()}") from e
+            raise
+
+        self._last_ok = time.monotonic()
+        for response in responses:
+            if response.txseq > 0:
+                self._txseq = response.txseq
+        return responses
+
+    def _pick_channel(self) -> int:
+        """Pick the next channel round-robin, skipping ones whose stream is busy."""
+        count = len(self._query_locks)
+        start = next(self._next_channel) % count
+        for offset in range(count):
+            index = (start + offset) % count
+            if not self._query_locks[index].locked():
+                return index
+        return start
+
+    async def _send_on_query_stream(
+        self,
+        index: int,
+        requests: List[_generated.QueryRequest],
+    ) -> List[_generated.QueryResponse]:
+        """Send requests over the channel's persistent stream; the lock must be held."""
+        stream = self._query_streams[index]
+        # Session state can only have been built on a stream from earlier calls.
+        had_session = self._session and stream is not None
+        writer: Optional[asyncio.Future] = None
+        try:
+            if self._session_lost:
+                # Reported once, on the first query after the loss.
+                self._session_lost = False
+                raise SessionLostError("Query stream was lost; the server-side session was reset")
+
+            if stream is not None:
+                try:
+                    await stream.write(requests[0])
+                except (grpc.RpcError, asyncio.InvalidStateError) as e:
+                    # The stream ended while idle, so the request was not
+                    # sent. Retry it on a fresh stream, unless that would
+                    # silently run it outside the session.
+                    if self._session:
+                        self._session_generation += 1
+                        raise SessionLostError(
+                            "Query stream was lost; the server-side session was reset"
+                        ) from e
+                    stream = None
+
+            if stream is None:
+                stream = self._stubs[index].Query(metadata=self._metadata)
+                self._query_streams[index] = stream
+                await stream.write(requests[0])
+
+            # Write the rest while reading, so neither side stalls on
+            # flow control when a batch has large responses.
+            if len(requests) > 1:
+                writer = asyncio.ensure_future(self._write_requests(stream, requests[1:]))
+
+            responses = []
+            for _ in requests:
+                response = await stream.read()
+                if response is grpc.aio.EOF:
+                    raise Exception("No response received")
+                responses.append(response)
+
+            if writer is not None:
+                await writer
+        except SessionLostError:
+            if stream is not None:
+                stream.cancel()
+            self._query_streams[index] = None
+            raise
+        except BaseException:
+            # A failed or interrupted round trip leaves the stream out of
+            # step with its responses; drop it and reopen on next use.
+            if writer is not None:
+                writer.cancel()
+            if stream is not None:
+                stream.cancel()
+            if had_session:
+                self._session_lost = True
+                self._session_generation += 1
+            self._query_streams[index] = None
+            raise
+
+        return responses
+
+    async def _send_on_new_stream(
+        self,
+        index: int,
+        requests: List[_generated.QueryRequest],
+    ) -> List[_generated.QueryResponse]:
+        """Send requests over a Query stream opened for this call only."""
+        call = self._stubs[index].Query(iter(requests), metadata=self._metadata)
+        try:
+            responses = [response async for response in call]
+        except BaseException:
+            call.cancel()
+            raise
 
-        except grpc.RpcError as e:
-            raise Exception(f"gRPC error: {e.code()}: {e.details()}") from e
+        if len(responses) < len(requests):
+            raise Exception("No response received")
+        return responses
 
-        raise Exception("No response received")
+    async def _write_requests(
+        self,
+        stream: grpc.aio.StreamStreamCall,
+        requests: List[_generated.QueryRequest],
+    ) -> None:
+        """Write requests to a Query stream in order."""
+        for request in requests:
+            await stream.write(request)
 
     async def execute_query(
         self,
@@ -185,14 +366,7 @@ class HAClient:
             raise Exception(response.error)
 
         columns = list(response.result_set.columns) if response.result_set else []
-        rows = []
-
-        if response.result_set and response.result_set.rows:
-            for row in response.result_set.rows:
-                row_data = []
-                for value in row.values:
-                    row_data.append(from_any(value))
-                rows.append(row_data)
+        rows = _decode_rows(response.result_set.rows) if response.result_set else []
 
         return ExecutionResult(columns=columns, rows=rows)
 
@@ -242,16 +416,50 @@ class HAClient:
             return ExecutionResult(rows_affected=response.rows_affected)
 
         columns = list(response.result_set.columns)
-        rows = []
-
-        for row in response.result_set.rows:
-            row_data = []
-            for value in row.values:
-                row_data.append(from_any(value))
-            rows.append(row_data)
+        rows = _decode_rows(response.result_set.rows)
 
         return ExecutionResult(columns=columns, rows=rows, rows_affected=response.rows_affected)
 
+    async def execute_batch(
+        self,
+        statements: List[Tuple[str, Optional[Dict[Union[str, int], Any]]]],
+    ) -> List[int]:
+        """
+        Execute several INSERT/UPDATE/DELETE statements in one round trip.
+
+        The statements are pipelined over a single Query stream, so they run
+        in order on the server. The batch is not atomic: a failing statement
+        does not stop the ones after it, and the others stay applied. Run the
+        batch inside a transaction if it must be all or nothing.
+
+        Args:
+            statements: (sql, parameters) pairs to execute.
+
+        Returns:
+            Number of rows affected by each statement.
+
+        Raises:
+            BatchExecutionError: If any statement failed.
+        """
+        if not statements:
+            return []
+
+        requests = [
+            self._build_request(sql, parameters, QueryType.EXEC_UPDATE)
+            for sql, parameters in statements
+        ]
+        responses = await self._send_requests(requests)
+
+        for index, response in enumerate(responses):
+            if response.error:
+                raise BatchExecutionError(
+                    f"Statement {index} failed: {response.error}",
+                    index,
+                    [None if r.error else r.rows_affected for r in responses],
+                )
+
+        return [response.rows_affected for response in responses]
+
     async def download_replica(
         self,
         directory: str,
@@ -266,36 +474,72 @@ class HAClient:
             replication_id: The replication ID to download.
             override: Whether to override existing files.
         """
-        await self._ensure_stub()
-
         file_path = os.path.join(directory, replication_id)
         if not override and os.path.exists(file_path):
             return
 
         os.makedirs(directory, exist_ok=True)
-        metadata = await self._get_metadata()
-
-        chunks = []
-        request = {"replication_id": replication_id}
-
-        async for response in self._stub.Download(request, metadata=metadata):
-            chunks.append(response.data)
 
-        with open(file_path, "wb") as f:
-            for chunk in chunks:
-                f.write(chunk)
+        request = _generated.DownloadRequest(replication_id=replication_id)
 
-    async def download_all_replicas(self, directory: str, override: bool = False) -> None:
+        # Write chunks as they arrive; the rename keeps a failed download
+        # from leaving a truncated replica behind. The temp file is hidden so
+        # EmbeddedReplicasManager.load() never picks it up as a replica.
+        tmp_path = os.path.join(directory, f".{replication_id}.download")
+        loop = asyncio.get_running_loop()
+        try:
+            with open(tmp_path, "wb") as f:
+                # Each write runs on a worker thread while the next chunk is
+                # received; at most one write is outstanding.
+                pending: Optional[asyncio.Future] = None
+                try:
+                    async for response in self._stub().Download(request, metadata=self._metadata):
+                        if pending is not None:
+                            await pending
+                        pending = loop.run_in_executor(None, f.write, response.data)
+                    if pending is not None:
+                        await pending
+                except BaseException:
+                    # Let an in-flight write finish before the file is closed.
+                    if pending is not None:
+                        await asyncio.wait([pending])
+                    raise
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def download_all_replicas(
+        self,
+        directory: str,
+        override: bool = False,
+        max_parallel: int = 8,
+    ) -> None:
         """
         Download all replica database files.
 
         Args:
             directory: Directory to save the replicas.
             override: Whether to override existing files.
+            max_parallel: Maximum number of replicas downloaded concurrently.
         """
         ids = await self.get_replication_ids()
-        for replication_id in ids:
-            await self.download_replica(directory, replication_id, override)
+        semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+        async def download(replication_id: str) -> None:
+            async with semaphore:
+                await self.download_replica(directory, replication_id, override)
+
+        tasks = [asyncio.ensure_future(download(replication_id)) for replication_id in ids]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancelled downloads to remove their temp files.
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
     async def get_replication_ids(self) -> List[str]:
         """
@@ -304,10 +548,7 @@ class HAClient:
         Returns:
             List of replication IDs.
         """
-        await self._ensure_stub()
-        metadata = await self._get_metadata()
-
-        response = await self._stub.ReplicationIDs(Empty(), metadata=metadata)
+        response = await self._stub().ReplicationIDs(Empty(), metadata=self._metadata)
         return list(response.replication_id)
 
     @property
@@ -325,7 +566,38 @@ class HAClient:
         """Get the current transaction sequence number."""
         return self._txseq
 
+    @property
+    def last_ok(self) -> float:
+        """Get the time.monotonic() of the last completed query round trip, or 0."""
+        return self._last_ok
+
+    def channel_states(self) -> List[grpc.ChannelConnectivity]:
+        """
+        Get the connectivity state of each channel without sending a query.
+
+        Idle channels are asked to start connecting.
+
+        Returns:
+            One state per channel.
+        """
+        return [channel.get_state(try_to_connect=True) for channel in self._channels]
+
+    @property
+    def session_generation(self) -> int:
+        """Get a counter that increases each time the session stream is lost."""
+        return self._session_generation
+
+    @property
+    def channels(self) -> List[grpc.aio.Channel]:
+        """Get the channels this client sends RPCs over."""
+        return self._channels
+
     async def close(self) -> None:
         """Close the client connection."""
-        if self._channel:
-            await self._channel.close()
+        for index, stream in enumerate(self._query_streams):
+            if stream is not None:
+                stream.cancel()
+                self._query_streams[index] = None
+
+        if self._owns_channels:
+            await asyncio.gather(*(channel.close() for channel in self._channels))
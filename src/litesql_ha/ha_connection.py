@@ -1,10 +1,16 @@
 """HA Connection for managing database connections."""
 
+import asyncio
+import re
 import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from .ha_client import HAClient, HAClientOptions, ExecutionResult
+import grpc
+
+from .ha_client import BatchExecutionError, HAClient, HAClientOptions, ExecutionResult
 from .embedded_replicas import EmbeddedReplicasManager
 
 
@@ -22,6 +28,97 @@ class HAConnectionOptions:
     replication_durable: Optional[str] = None
 
 
+# Anchored at the start, so only leading whitespace and the first token are
+# scanned rather than upper-casing the whole statement.
+_READ_ONLY_PREFIX = re.compile(r"\s*(?:SELECT|PRAGMA|EXPLAIN|WITH)", re.IGNORECASE)
+
+
+def _is_select_query(sql: str) -> bool:
+    """Check if the SQL is a read-only query."""
+    return _READ_ONLY_PREFIX.match(sql) is not None
+
+
+class BufferedExecution:
+    """
+    Buffers statements client-side and sends them to the server in batches.
+
+    Example:
+        async with conn.buffered_execution(batch_size=256) as batch:
+            for user in users:
+                await batch.execute("INSERT INTO users (name) VALUES (?)", {1: user})
+    """
+
+    def __init__(self, client: HAClient, batch_size: int = 128):
+        """Initialize the buffer."""
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self._client = client
+        self._batch_size = batch_size
+        self._pending: List[Tuple[str, Optional[Dict[Union[str, int], Any]]]] = []
+        self._rows_affected = 0
+
+    async def execute(
+        self,
+        sql: str,
+        params: Optional[Dict[Union[str, int], Any]] = None,
+    ) -> None:
+        """
+        Queue an INSERT/UPDATE/DELETE statement, flushing once the batch is full.
+
+        Args:
+            sql: The SQL statement to execute.
+            params: Optional dictionary of parameters.
+        """
+        self._pending.append((sql, params))
+        if len(self._pending) >= self._batch_size:
+            await self.flush()
+
+    async def flush(self) -> List[int]:
+        """
+        Send all queued statements to the server.
+
+        The queue is emptied even if the flush fails, since the statements
+        were already sent; see HAClient.execute_batch() for atomicity.
+
+        Returns:
+            Number of rows affected by each flushed statement.
+
+        Raises:
+            BatchExecutionError: If any statement failed. The rows affected
+                by the statements that succeeded are still counted.
+        """
+        pending, self._pending = self._pending, []
+        try:
+            counts = await self._client.execute_batch(pending)
+        except BatchExecutionError as e:
+            self._rows_affected += sum(count for count in e.rows_affected if count)
+            raise
+        self._rows_affected += sum(counts)
+        return counts
+
+    @property
+    def pending(self) -> int:
+        """Get the number of queued statements."""
+        return len(self._pending)
+
+    @property
+    def rows_affected(self) -> int:
+        """Get the total number of rows affected by flushed statements."""
+        return self._rows_affected
+
+    async def __aenter__(self) -> "BufferedExecution":
+        """Context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Context manager exit; flushes unless the block raised."""
+        if exc_type is None:
+            await self.flush()
+        else:
+            self._pending.clear()
+
+
 class HAConnection:
     """
     Represents a connection to the HA database.
@@ -33,25 +130,47 @@ class HAConnection:
         await conn.close()
     """
 
-    def __init__(self, options: HAConnectionOptions):
-        """Initialize the connection."""
+    def __init__(
+        self,
+        options: HAConnectionOptions,
+        channel: Optional[grpc.aio.Channel] = None,
+    ):
+        """
+        Initialize the connection.
+
+        Args:
+            options: Connection configuration options.
+            channel: An existing gRPC channel to share, e.g. from a data
+                source, instead of opening a new one. It is not closed by close().
+        """
         client_options = HAClientOptions(
             url=options.url,
             token=options.token,
             enable_ssl=options.enable_ssl,
             timeout=options.timeout,
+            # One channel and one long-lived stream, so the connection's
+            # statements (BEGIN, COMMIT, PRAGMAs, ...) all share the same
+            # server-side session.
+            pool_size=1,
+            session=True,
         )
-        self._client = HAClient(client_options)
+        self._client = HAClient(client_options, [channel] if channel is not None else None)
+        self._replication_id = self._client.replication_id
         self._embedded_replica: Optional[sqlite3.Connection] = None
         self._replicas_manager: Optional[EmbeddedReplicasManager] = None
+        # Replica queries run here so they don't block the event loop; one
+        # worker keeps each sqlite3 connection on a single thread.
+        self._sqlite_exec: Optional[ThreadPoolExecutor] = None
         self._closed = False
         self._auto_commit = True
         self._read_only = False
+        self._session_generation = self._client.session_generation
 
         if options.embedded_replicas_dir and options.replication_url:
             self._replicas_manager = EmbeddedReplicasManager.get_instance()
+            self._sqlite_exec = ThreadPoolExecutor(max_workers=1)
             self._embedded_replica = self._replicas_manager.create_connection(
-                self._client.replication_id
+                self._replication_id
             )
 
     async def query(
@@ -70,14 +189,12 @@ class HAConnection:
             ExecutionResult with columns and rows.
         """
         if (
-            self._embedded_replica
-            and self._replicas_manager
-            and self._is_select_query(sql)
-            and self._replicas_manager.is_replica_updated(
-                self._client.replication_id, self._client.txseq
-            )
+            self._embedded_replica is not None
+            and self._replicas_manager is not None
+            and _is_select_query(sql)
+            and self._replicas_manager.is_replica_updated(self._replication_id, self._client.txseq)
         ):
-            return self._execute_on_replica(sql, params)
+            return await self._execute_on_replica(sql, params)
 
         return await self._client.execute_query(sql, params)
 
@@ -98,6 +215,20 @@ class HAConnection:
         """
         return await self._client.execute_update(sql, params)
 
+    def buffered_execution(self, batch_size: int = 128) -> BufferedExecution:
+        """
+        Buffer INSERT/UPDATE/DELETE statements and send them in batches.
+
+        Each batch is sent in a single round trip instead of one per statement.
+
+        Args:
+            batch_size: Number of statements to buffer before flushing.
+
+        Returns:
+            A BufferedExecution to use as an async context manager.
+        """
+        return BufferedExecution(self._client, batch_size)
+
     async def run(
         self,
         sql: str,
@@ -114,18 +245,16 @@ class HAConnection:
             ExecutionResult with columns, rows, and rows_affected.
         """
         if (
-            self._embedded_replica
-            and self._replicas_manager
-            and self._is_select_query(sql)
-            and self._replicas_manager.is_replica_updated(
-                self._client.replication_id, self._client.txseq
-            )
+            self._embedded_replica is not None
+            and self._replicas_manager is not None
+            and _is_select_query(sql)
+            and self._replicas_manager.is_replica_updated(self._replication_id, self._client.txseq)
         ):
-            return self._execute_on_replica(sql, params)
+            return await self._execute_on_replica(sql, params)
 
         return await self._client.execute(sql, params)
 
-    def _execute_on_replica(
+    async def _execute_on_replica(
         self,
         sql: str,
         params: Optional[Dict[str, Any]] = None,
@@ -134,7 +263,18 @@ class HAConnection:
         if not self._embedded_replica:
             raise Exception("No embedded replica available")
 
-        cursor = self._embedded_replica.cursor()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._sqlite_exec, self._do_replica_query, self._embedded_replica, sql, params
+        )
+
+    @staticmethod
+    def _do_replica_query(
+        conn: sqlite3.Connection,
+        sql: str,
+        params: Optional[Dict[str, Any]],
+    ) -> ExecutionResult:
+        """Run a query on a replica connection; called on the sqlite thread."""
+        cursor = conn.cursor()
 
         if params:
             cursor.execute(sql, params)
@@ -144,38 +284,38 @@ class HAConnection:
         rows = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description] if cursor.description else []
 
-        return ExecutionResult(
-            columns=columns,
-            rows=[list(row) for row in rows],
-        )
+        # Rows are returned as the tuples sqlite3 produced, without a copy.
+        return ExecutionResult(columns=columns, rows=rows)
 
-    def _is_select_query(self, sql: str) -> bool:
-        """Check if the SQL is a read-only query."""
-        trimmed = sql.strip().upper()
-        return (
-            trimmed.startswith("SELECT")
-            or trimmed.startswith("PRAGMA")
-            or trimmed.startswith("EXPLAIN")
-            or trimmed.startswith("WITH")
-        )
+    def _sync_session_state(self) -> None:
+        """Reset transaction and read-only state if the server-side session was lost."""
+        generation = self._client.session_generation
+        if generation != self._session_generation:
+            self._session_generation = generation
+            self._auto_commit = True
+            self._read_only = False
 
     async def begin_transaction(self) -> None:
         """Begin a transaction."""
         await self._client.execute_update("BEGIN")
+        self._sync_session_state()
         self._auto_commit = False
 
     async def commit(self) -> None:
         """Commit the current transaction."""
         await self._client.execute_update("COMMIT")
+        self._sync_session_state()
         self._auto_commit = True
 
     async def rollback(self) -> None:
         """Rollback the current transaction."""
         await self._client.execute_update("ROLLBACK")
+        self._sync_session_state()
         self._auto_commit = True
 
     async def set_auto_commit(self, auto_commit: bool) -> None:
         """Set auto-commit mode."""
+        self._sync_session_state()
         if auto_commit == self._auto_commit:
             return
 
@@ -184,28 +324,54 @@ class HAConnection:
         else:
             await self._client.execute_update("BEGIN")
 
+        self._sync_session_state()
         self._auto_commit = auto_commit
 
     @property
     def auto_commit(self) -> bool:
         """Get auto-commit mode."""
+        self._sync_session_state()
         return self._auto_commit
 
     async def set_read_only(self, read_only: bool) -> None:
         """Set read-only mode."""
         pragma = "PRAGMA query_only = 1" if read_only else "PRAGMA query_only = 0"
         await self._client.execute_update(pragma)
+        self._sync_session_state()
         self._read_only = read_only
 
     @property
     def read_only(self) -> bool:
         """Get read-only mode."""
+        self._sync_session_state()
         return self._read_only
 
     async def is_valid(self, timeout: int = 5) -> bool:
-        """Check if the connection is valid."""
+        """
+        Check if the connection is valid.
+
+        A query that completed within the last `timeout` seconds, or a
+        connected channel, counts as valid and a channel that failed to
+        connect as invalid; otherwise SELECT 1 is sent.
+
+        Args:
+            timeout: Seconds a previous round trip stays trusted, and the
+                limit for the fallback query.
+        """
+        if self._closed:
+            return False
+
+        if time.monotonic() - self._client.last_ok < timeout:
+            return True
+
+        states = self._client.channel_states()
+        if grpc.ChannelConnectivity.TRANSIENT_FAILURE in states:
+            return False
+        if grpc.ChannelConnectivity.READY in states:
+            return True
+
         try:
-            await self._client.execute_query("SELECT 1")
+            await asyncio.wait_for(self._client.execute_query("SELECT 1"), timeout)
             return True
         except Exception:
             return False
@@ -213,19 +379,33 @@ class HAConnection:
     @property
     def catalog(self) -> str:
         """Get the current catalog (database name)."""
-        return self._client.replication_id
+        return self._replication_id
 
     async def set_catalog(self, catalog: str) -> None:
         """Set the current catalog (database name)."""
         if not catalog:
             raise ValueError("Catalog cannot be empty")
 
+        # Keep the current replica connection when the catalog is unchanged.
+        if catalog == self._replication_id and (
+            self._embedded_replica is not None or self._replicas_manager is None
+        ):
+            return
+
         self._client.replication_id = catalog
+        self._replication_id = catalog
 
         if self._replicas_manager:
-            if self._embedded_replica:
-                self._embedded_replica.close()
+            previous = self._embedded_replica
             self._embedded_replica = self._replicas_manager.create_connection(catalog)
+            if previous:
+                if self._sqlite_exec is not None:
+                    # Queries already queued still hold the previous connection;
+                    # the single worker runs them before this no-op.
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._sqlite_exec, lambda: None
+                    )
+                self._replicas_manager.release_connection(previous)
 
     @property
     def client(self) -> HAClient:
@@ -244,8 +424,17 @@ class HAConnection:
 
         await self._client.close()
 
+        if self._sqlite_exec is not None:
+            # Let an in-flight replica query finish before the connection
+            # goes back to the pool.
+            await asyncio.get_running_loop().run_in_executor(None, self._sqlite_exec.shutdown)
+            self._sqlite_exec = None
+
         if self._embedded_replica:
-            self._embedded_replica.close()
+            if self._replicas_manager:
+                self._replicas_manager.release_connection(self._embedded_replica)
+            else:
+                self._embedded_replica.close()
             self._embedded_replica = None
 
         self._closed = True
@@ -1,7 +1,9 @@
 """HA DataSource for managing database connections."""
 
+import itertools
+import weakref
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import List, Optional
 
 from .ha_client import HAClient, HAClientOptions
 from .ha_connection import HAConnection, HAConnectionOptions
@@ -45,6 +47,13 @@ class HADataSource:
         self._replication_url: Optional[str] = None
         self._replication_stream: Optional[str] = None
         self._replication_durable: Optional[str] = None
+        self._client: Optional[HAClient] = None
+        self._retired_clients: List[HAClient] = []
+        self._next_channel = itertools.count()
+        # The client whose channels each connection handed out is using.
+        self._borrowers: "weakref.WeakKeyDictionary[HAConnection, HAClient]" = (
+            weakref.WeakKeyDictionary()
+        )
 
         if options:
             self._url = options.url
@@ -64,6 +73,8 @@ class HADataSource:
         Returns:
             A new HAConnection instance.
         """
+        await self._close_idle_clients()
+
         if (
             self._embedded_replicas_dir
             and self._replication_url
@@ -90,7 +101,15 @@ class HADataSource:
             replication_durable=self._replication_durable,
         )
 
-        return HAConnection(options)
+        # Connections share the data source's channels, so getting one does
+        # not pay for a new TCP/TLS handshake. Each is pinned to one channel,
+        # spreading connections round-robin over the pool.
+        client = self._get_client()
+        channels = client.channels
+        channel = channels[next(self._next_channel) % len(channels)]
+        conn = HAConnection(options, channel)
+        self._borrowers[conn] = client
+        return conn
 
     async def download_replicas(self, directory: str, override: bool = False) -> None:
         """
@@ -100,18 +119,61 @@ class HADataSource:
             directory: Directory to save the replicas.
             override: Whether to override existing files.
         """
-        client = HAClient(
-            HAClientOptions(
-                url=self._url,
-                token=self._password,
-                enable_ssl=self._enable_ssl,
-                timeout=self._timeout,
+        await self._close_idle_clients()
+        await self._get_client().download_all_replicas(directory, override)
+
+    def _get_client(self) -> HAClient:
+        """Get the data source's client, creating it on first use."""
+        if self._client is None:
+            self._client = HAClient(
+                HAClientOptions(
+                    url=self._url,
+                    token=self._password,
+                    enable_ssl=self._enable_ssl,
+                    timeout=self._timeout,
+                )
             )
-        )
+        return self._client
+
+    def _reset_client(self) -> None:
+        """Retire the current client so the next use picks up new settings."""
+        if self._client is not None:
+            # Open connections may still use its channels; it is closed once
+            # they are, see _close_idle_clients().
+            self._retired_clients.append(self._client)
+            self._client = None
+
+    async def _close_idle_clients(self) -> None:
+        """Close retired clients that no open connection borrows channels from."""
+        if not self._retired_clients:
+            return
+
+        in_use = {
+            client for conn, client in self._borrowers.items() if not conn.is_closed
+        }
+        idle = [client for client in self._retired_clients if client not in in_use]
+        self._retired_clients = [
+            client for client in self._retired_clients if client in in_use
+        ]
+
+        for client in idle:
+            await client.close()
+
+    async def close(self) -> None:
+        """
+        Close the clients owned by the data source.
 
-        try:
-            await client.download_all_replicas(directory, override)
-        finally:
+        Connections obtained from get_connection() share these channels and
+        stop working once the data source is closed.
+        """
+        clients = self._retired_clients
+        if self._client is not None:
+            clients.append(self._client)
+        self._client = None
+        self._retired_clients = []
+        self._borrowers.clear()
+
+        for client in clients:
             await client.close()
 
     @property
@@ -123,6 +185,7 @@ class HADataSource:
     def url(self, value: str) -> None:
         """Set the server URL."""
         self._url = value
+        self._reset_client()
 
     @property
     def password(self) -> str:
@@ -133,6 +196,7 @@ class HADataSource:
     def password(self, value: str) -> None:
         """Set the authentication password/token."""
         self._password = value
+        self._reset_client()
 
     @property
     def enable_ssl(self) -> bool:
@@ -143,6 +207,7 @@ class HADataSource:
     def enable_ssl(self, value: bool) -> None:
         """Set SSL enabled status."""
         self._enable_ssl = value
+        self._reset_client()
 
     @property
     def timeout(self) -> int:
@@ -152,6 +217,7 @@ class HADataSource:
     @timeout.setter
     def timeout(self, value: int) -> None:
         """Set the query timeout in seconds."""
+        # Only passed on to new connections; the channels don't depend on it.
         self._timeout = value
 
     @property
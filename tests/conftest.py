@@ -0,0 +1,104 @@
+"""Shared fixtures: an in-process DatabaseService backed by in-memory SQLite."""
+
+import asyncio
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import grpc
+import pytest
+
+from litesql_ha._generated import sql_pb2, sql_pb2_grpc
+from litesql_ha.client.converter import from_any, to_any
+
+
+class FakeDatabaseService(sql_pb2_grpc.DatabaseServiceServicer):
+    """
+    Minimal DatabaseService that runs statements on an in-memory database.
+
+    Statements starting with "-- sleep <seconds>" are delayed first, to
+    simulate slow queries.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the service."""
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+        self.streams = 0
+        self.queries = 0
+        self.replication_ids: List[str] = ["a.db", "b.db"]
+        # When set, Download aborts with this message after the first chunk.
+        self.download_error: Optional[str] = None
+
+    async def Query(self, request_iterator, context):  # noqa: N802
+        """Answer each request on the stream in order."""
+        self.streams += 1
+        async for request in request_iterator:
+            self.queries += 1
+            if request.sql.startswith("-- sleep "):
+                await asyncio.sleep(float(request.sql.split()[2]))
+            yield self._execute(request)
+
+    def _execute(self, request: sql_pb2.QueryRequest) -> sql_pb2.QueryResponse:
+        params: Dict[Any, Any] = {}
+        for param in request.params:
+            params[param.name or param.ordinal] = from_any(param.value)
+        if params and all(isinstance(key, int) for key in params):
+            args: Any = [params[key] for key in sorted(params)]
+        else:
+            args = params
+
+        response = sql_pb2.QueryResponse()
+        try:
+            cursor = self.db.execute(request.sql, args)
+            if cursor.description:
+                response.result_set.columns.extend(d[0] for d in cursor.description)
+                for row in cursor.fetchall():
+                    response.result_set.rows.add().values.extend(to_any(v) for v in row)
+            response.rows_affected = max(cursor.rowcount, 0)
+            response.txseq = self.queries
+        except sqlite3.Error as e:
+            response.error = str(e)
+        return response
+
+    async def Download(self, request, context):  # noqa: N802
+        """Stream a few chunks derived from the replication id."""
+        for i in range(3):
+            if i and self.download_error:
+                await context.abort(grpc.StatusCode.INTERNAL, self.download_error)
+            yield sql_pb2.DownloadResponse(data=f"{request.replication_id}{i}".encode() * 100)
+
+    async def ReplicationIDs(self, request, context):  # noqa: N802
+        """List the replication ids."""
+        return sql_pb2.ReplicationIDsResponse(replication_id=self.replication_ids)
+
+
+@dataclass
+class FakeServer:
+    """A running fake server."""
+
+    server: grpc.aio.Server
+    service: FakeDatabaseService
+    port: int
+    url: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.url = f"litesql://127.0.0.1:{self.port}/db"
+
+
+async def start_server(port: int = 0) -> FakeServer:
+    """Start a fake server, on a free port unless one is given."""
+    service = FakeDatabaseService()
+    server = grpc.aio.server()
+    sql_pb2_grpc.add_DatabaseServiceServicer_to_server(service, server)
+    port = server.add_insecure_port(f"127.0.0.1:{port}")
+    await server.start()
+    return FakeServer(server=server, service=service, port=port)
+
+
+@pytest.fixture
+async def fake_server() -> AsyncIterator[FakeServer]:
+    """A fake server that is stopped after the test."""
+    server = await start_server()
+    yield server
+    await server.server.stop(None)
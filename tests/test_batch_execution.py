@@ -0,0 +1,117 @@
+"""Tests for HAClient.execute_batch and BufferedExecution."""
+
+import pytest
+
+from litesql_ha import (
+    BatchExecutionError,
+    HAClient,
+    HAClientOptions,
+    HAConnection,
+    HAConnectionOptions,
+)
+
+
+async def test_execute_batch_returns_rows_affected_in_order(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url))
+    try:
+        counts = await client.execute_batch(
+            [
+                ("INSERT INTO t (name) VALUES (?)", {1: "a"}),
+                ("INSERT INTO t (name) VALUES (:name)", {"name": "b"}),
+                ("UPDATE t SET name = name || 'x'", None),
+            ]
+        )
+        assert counts == [1, 1, 2]
+
+        result = await client.execute_query("SELECT name FROM t ORDER BY id")
+        assert result.rows == [("ax",), ("bx",)]
+    finally:
+        await client.close()
+
+
+async def test_execute_batch_empty(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url))
+    try:
+        assert await client.execute_batch([]) == []
+        assert fake_server.service.queries == 0
+    finally:
+        await client.close()
+
+
+async def test_execute_batch_is_not_atomic(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url))
+    try:
+        with pytest.raises(BatchExecutionError) as info:
+            await client.execute_batch(
+                [
+                    ("INSERT INTO t (name) VALUES ('a')", None),
+                    ("INSERT INTO t (name) VALUES ('a')", None),
+                    ("INSERT INTO t (name) VALUES ('b')", None),
+                ]
+            )
+        assert info.value.index == 1
+        assert info.value.rows_affected == [1, None, 1]
+        assert "UNIQUE" in str(info.value)
+
+        result = await client.execute_query("SELECT name FROM t ORDER BY id")
+        assert result.rows == [("a",), ("b",)]
+    finally:
+        await client.close()
+
+
+async def test_buffered_execution_flushes_in_batches(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        async with conn.buffered_execution(batch_size=2) as batch:
+            for name in ("a", "b", "c"):
+                await batch.execute("INSERT INTO t (name) VALUES (?)", {1: name})
+            assert batch.pending == 1
+            assert batch.rows_affected == 2
+        assert batch.pending == 0
+        assert batch.rows_affected == 3
+
+        result = await conn.query("SELECT count(*) FROM t")
+        assert result.rows[0][0] == 3
+    finally:
+        await conn.close()
+
+
+async def test_buffered_execution_discards_pending_on_error(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        with pytest.raises(RuntimeError):
+            async with conn.buffered_execution() as batch:
+                await batch.execute("INSERT INTO t (name) VALUES ('a')")
+                raise RuntimeError("boom")
+        assert batch.pending == 0
+
+        result = await conn.query("SELECT count(*) FROM t")
+        assert result.rows[0][0] == 0
+    finally:
+        await conn.close()
+
+
+async def test_buffered_execution_counts_successes_of_failed_flush(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        batch = conn.buffered_execution()
+        await batch.execute("INSERT INTO t (name) VALUES ('a')")
+        await batch.execute("INSERT INTO nope (name) VALUES ('b')")
+        await batch.execute("INSERT INTO t (name) VALUES ('c')")
+
+        with pytest.raises(BatchExecutionError) as info:
+            await batch.flush()
+        assert info.value.index == 1
+        assert batch.pending == 0
+        assert batch.rows_affected == 2
+    finally:
+        await conn.close()
+
+
+async def test_buffered_execution_rejects_empty_batches(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        with pytest.raises(ValueError):
+            conn.buffered_execution(batch_size=0)
+    finally:
+        await conn.close()
@@ -0,0 +1,42 @@
+"""Tests for the protobuf Any converter."""
+
+from datetime import datetime, timedelta, timezone, tzinfo
+
+import pytest
+from google.protobuf.timestamp_pb2 import Timestamp
+
+from litesql_ha.client.converter import from_any, to_any
+
+
+class _NoOffset(tzinfo):
+    """A tzinfo that leaves the datetime naive (utcoffset() is None)."""
+
+    def utcoffset(self, dt):
+        return None
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        datetime(2024, 5, 1, 3, 4, 5, 123456),
+        datetime(2024, 5, 1, 3, 4, 5, tzinfo=timezone(timedelta(hours=3))),
+        datetime(2024, 5, 1, 3, 4, 5, tzinfo=_NoOffset()),
+        datetime(1960, 1, 1),
+    ],
+)
+def test_timestamp_matches_from_datetime(value):
+    expected = Timestamp()
+    expected.FromDatetime(value)
+    assert to_any(value).value == expected.SerializeToString()
+
+
+@pytest.mark.parametrize(
+    "value",
+    [None, "", "text", "é" * 200, True, False, 0, -5, 2**40, 1.5, b"", b"\x00\x01", b"x" * 300],
+)
+def test_round_trip(value):
+    assert from_any(to_any(value)) == value
+
+
+def test_bytearray_round_trips_as_bytes():
+    assert from_any(to_any(bytearray(b"zz"))) == b"zz"
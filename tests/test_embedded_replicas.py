@@ -0,0 +1,77 @@
+"""Tests for EmbeddedReplicasManager's read-only connection pool."""
+
+import sqlite3
+
+import pytest
+
+from litesql_ha import EmbeddedReplicasManager
+
+
+@pytest.fixture
+async def manager(tmp_path):
+    """A manager with one replica, a.db, registered without NATS."""
+    path = tmp_path / "a.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        db.execute("INSERT INTO t VALUES (1)")
+    db.close()
+
+    EmbeddedReplicasManager._instance = None
+    manager = EmbeddedReplicasManager.get_instance()
+    manager._replicas["a.db"] = manager._open_replica(str(path))
+    yield manager
+    await manager.close()
+    EmbeddedReplicasManager._instance = None
+
+
+async def test_create_connection_unknown_replica(manager):
+    assert manager.create_connection("missing.db") is None
+
+
+async def test_create_connection_is_read_only(manager):
+    conn = manager.create_connection("a.db")
+    assert conn.execute("SELECT id FROM t").fetchall() == [(1,)]
+    assert conn.execute("PRAGMA query_only").fetchone() == (1,)
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("INSERT INTO t VALUES (2)")
+    manager.release_connection(conn)
+
+
+async def test_released_connection_is_reused(manager):
+    conn = manager.create_connection("a.db")
+    manager.release_connection(conn)
+    assert manager.create_connection("a.db") is conn
+
+
+async def test_leased_connections_are_distinct(manager):
+    first = manager.create_connection("a.db")
+    second = manager.create_connection("a.db")
+    assert first is not second
+    manager.release_connection(first)
+    manager.release_connection(second)
+
+
+async def test_pool_is_bounded(manager):
+    conns = [manager.create_connection("a.db") for _ in range(manager.RO_POOL_SIZE + 1)]
+    for conn in conns:
+        manager.release_connection(conn)
+
+    # The connection released into a full pool is closed instead of kept.
+    with pytest.raises(sqlite3.ProgrammingError):
+        conns[-1].execute("SELECT 1")
+    assert conns[0].execute("SELECT 1").fetchone() == (1,)
+
+
+async def test_release_of_unknown_connection_closes_it(manager):
+    conn = sqlite3.connect(":memory:")
+    manager.release_connection(conn)
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+async def test_close_closes_pooled_connections(manager):
+    conn = manager.create_connection("a.db")
+    manager.release_connection(conn)
+    await manager.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
@@ -0,0 +1,66 @@
+"""Tests for HAConnection query routing between the server and a replica."""
+
+import sqlite3
+
+import pytest
+
+from litesql_ha import EmbeddedReplicasManager, HAConnection, HAConnectionOptions
+
+
+@pytest.fixture
+async def replica_manager(tmp_path):
+    """A manager with a replica named "db" (the fake server's catalog)."""
+    path = tmp_path / "db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+        db.execute("INSERT INTO t (name) VALUES ('replica')")
+    db.close()
+
+    EmbeddedReplicasManager._instance = None
+    manager = EmbeddedReplicasManager.get_instance()
+    manager._replicas["db"] = manager._open_replica(str(path))
+    yield manager
+    await manager.close()
+    EmbeddedReplicasManager._instance = None
+
+
+def _options(url, tmp_path):
+    return HAConnectionOptions(
+        url=url,
+        embedded_replicas_dir=str(tmp_path),
+        replication_url="nats://127.0.0.1:4222",
+    )
+
+
+async def test_server_rows_are_tuples(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        result = await conn.query("SELECT 1, 'a'")
+        assert result.rows == [(1, "a")]
+    finally:
+        await conn.close()
+
+
+async def test_replica_and_server_rows_have_the_same_type(fake_server, replica_manager, tmp_path):
+    conn = HAConnection(_options(fake_server.url, tmp_path))
+    try:
+        from_replica = await conn.query("SELECT name FROM t")
+        assert from_replica.rows == [("replica",)]
+        assert fake_server.service.queries == 0
+
+        # Once the server is ahead of the replica, reads go to the server.
+        await conn.execute("INSERT INTO t (name) VALUES ('server')")
+        from_server = await conn.query("SELECT name FROM t")
+        assert from_server.rows == [("server",)]
+        assert type(from_server.rows[0]) is type(from_replica.rows[0])
+    finally:
+        await conn.close()
+
+
+async def test_writes_go_to_the_server(fake_server, replica_manager, tmp_path):
+    conn = HAConnection(_options(fake_server.url, tmp_path))
+    try:
+        assert await conn.execute("INSERT INTO t (name) VALUES ('x')") == 1
+        assert fake_server.service.queries == 1
+    finally:
+        await conn.close()
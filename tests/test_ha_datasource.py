@@ -0,0 +1,102 @@
+"""Tests for HADataSource's shared client and close()."""
+
+import pytest
+
+from litesql_ha import HADataSource, HADataSourceOptions
+
+
+async def test_connections_share_the_data_source_channels(fake_server):
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    try:
+        first = await ds.get_connection()
+        second = await ds.get_connection()
+        pool = ds._get_client().channels
+        assert len(first.client.channels) == 1
+        assert len(second.client.channels) == 1
+        assert first.client.channels[0] in pool
+        assert second.client.channels[0] in pool
+        assert first.client.channels[0] is not second.client.channels[0]
+
+        assert (await first.query("SELECT 1")).rows[0][0] == 1
+        await first.close()
+        # Closing a connection leaves the shared channels open.
+        assert (await second.query("SELECT 2")).rows[0][0] == 2
+        await second.close()
+    finally:
+        await ds.close()
+
+
+async def test_close_stops_borrowed_connections(fake_server):
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    conn = await ds.get_connection()
+    assert (await conn.query("SELECT 1")).rows[0][0] == 1
+
+    await ds.close()
+    with pytest.raises(Exception):
+        await conn.query("SELECT 1")
+    await conn.close()
+
+
+async def test_close_is_idempotent(fake_server):
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    await ds.get_connection()
+    await ds.close()
+    await ds.close()
+
+
+async def test_close_without_use(fake_server):
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    await ds.close()
+
+
+async def test_timeout_change_keeps_the_client(fake_server):
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    try:
+        client = ds._get_client()
+        ds.timeout = 5
+        assert ds._get_client() is client
+    finally:
+        await ds.close()
+
+
+async def test_retired_client_is_closed_once_its_connections_are(fake_server):
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    try:
+        conn = await ds.get_connection()
+        ds.password = "secret"
+        assert len(ds._retired_clients) == 1
+
+        # Still borrowed by an open connection.
+        other = await ds.get_connection()
+        assert len(ds._retired_clients) == 1
+        assert (await conn.query("SELECT 1")).rows[0][0] == 1
+
+        await conn.close()
+        await other.close()
+        await ds.get_connection()
+        assert ds._retired_clients == []
+    finally:
+        await ds.close()
+
+
+async def test_download_replicas(fake_server, tmp_path):
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    try:
+        await ds.download_replicas(str(tmp_path))
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a.db", "b.db"]
+        assert (tmp_path / "a.db").read_bytes() == b"".join(
+            f"a.db{i}".encode() * 100 for i in range(3)
+        )
+    finally:
+        await ds.close()
+
+
+async def test_failed_download_leaves_no_files(fake_server, tmp_path):
+    fake_server.service.download_error = "disk on fire"
+    ds = HADataSource(HADataSourceOptions(url=fake_server.url))
+    try:
+        with pytest.raises(Exception):
+            await ds.download_replicas(str(tmp_path))
+        assert list(tmp_path.iterdir()) == []
+    finally:
+        await ds.close()
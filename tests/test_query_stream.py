@@ -0,0 +1,154 @@
+"""Tests for HAClient's persistent Query streams."""
+
+import asyncio
+import time
+
+import pytest
+from conftest import start_server
+
+from litesql_ha import (
+    HAClient,
+    HAClientOptions,
+    HAConnection,
+    HAConnectionOptions,
+    SessionLostError,
+)
+
+
+async def test_sequential_queries_reuse_one_stream(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url, pool_size=1))
+    try:
+        for i in range(5):
+            result = await client.execute_query("SELECT ?", {1: i})
+            assert result.rows[0][0] == i
+        assert fake_server.service.streams == 1
+        assert fake_server.service.queries == 5
+    finally:
+        await client.close()
+
+
+async def test_connection_statements_share_one_stream(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        assert len(conn.client.channels) == 1
+        await conn.set_auto_commit(False)
+        await conn.execute("INSERT INTO t (name) VALUES ('a')")
+        await conn.execute("INSERT INTO t (name) VALUES ('b')")
+        await conn.commit()
+        assert fake_server.service.streams == 1
+    finally:
+        await conn.close()
+
+
+async def test_concurrent_queries_do_not_queue_behind_busy_streams(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url, pool_size=2))
+    try:
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *(client.execute_query(f"-- sleep 0.5\nSELECT {i}") for i in range(6))
+        )
+        assert time.monotonic() - start < 1.0
+        assert [result.rows[0][0] for result in results] == list(range(6))
+    finally:
+        await client.close()
+
+
+async def test_fast_query_does_not_wait_for_slow_one(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url, pool_size=1))
+    try:
+        slow = asyncio.ensure_future(client.execute_query("-- sleep 1\nSELECT 1"))
+        await asyncio.sleep(0.1)
+        start = time.monotonic()
+        result = await client.execute_query("SELECT 2")
+        assert time.monotonic() - start < 0.5
+        assert result.rows[0][0] == 2
+        assert (await slow).rows[0][0] == 1
+    finally:
+        await client.close()
+
+
+async def test_connection_waits_for_its_session_stream(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        await conn.set_auto_commit(False)
+        slow = asyncio.ensure_future(conn.query("-- sleep 0.3\nSELECT 1"))
+        await asyncio.sleep(0.05)
+        await conn.execute("INSERT INTO t (name) VALUES ('a')")
+        assert slow.done()
+        await conn.commit()
+        assert fake_server.service.streams == 1
+    finally:
+        await conn.close()
+
+
+async def test_connection_reports_lost_session():
+    server = await start_server()
+    conn = HAConnection(HAConnectionOptions(url=server.url))
+    try:
+        await conn.set_auto_commit(False)
+        await conn.set_read_only(True)
+        await server.server.stop(None)
+        server = await start_server(server.port)
+
+        with pytest.raises(SessionLostError):
+            await conn.execute("INSERT INTO t (name) VALUES ('a')")
+        assert conn.auto_commit is True
+        assert conn.read_only is False
+
+        # The next statement starts a new session.
+        assert await conn.execute("INSERT INTO t (name) VALUES ('a')") == 1
+    finally:
+        await conn.close()
+        await server.server.stop(None)
+
+
+async def test_connection_reports_session_lost_by_cancellation(fake_server):
+    conn = HAConnection(HAConnectionOptions(url=fake_server.url))
+    try:
+        await conn.set_auto_commit(False)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(conn.query("-- sleep 1\nSELECT 1"), 0.1)
+        assert conn.auto_commit is True
+
+        with pytest.raises(SessionLostError):
+            await conn.query("SELECT 2")
+        assert (await conn.query("SELECT 3")).rows[0][0] == 3
+    finally:
+        await conn.close()
+
+
+async def test_cancelled_query_does_not_desync_stream(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url, pool_size=1))
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.execute_query("-- sleep 1\nSELECT 1"), 0.1)
+
+        result = await client.execute_query("SELECT 2")
+        assert result.rows[0][0] == 2
+    finally:
+        await client.close()
+
+
+async def test_stream_recovers_after_server_restart():
+    server = await start_server()
+    client = HAClient(HAClientOptions(url=server.url, pool_size=1))
+    try:
+        assert (await client.execute_query("SELECT 1")).rows[0][0] == 1
+        await server.server.stop(None)
+
+        server = await start_server(server.port)
+        assert (await client.execute_query("SELECT 2")).rows[0][0] == 2
+    finally:
+        await client.close()
+        await server.server.stop(None)
+
+
+async def test_server_error_keeps_stream_usable(fake_server):
+    client = HAClient(HAClientOptions(url=fake_server.url, pool_size=1))
+    try:
+        with pytest.raises(Exception, match="no such table"):
+            await client.execute_query("SELECT * FROM nope")
+        assert (await client.execute_query("SELECT 1")).rows[0][0] == 1
+        assert fake_server.service.streams == 1
+    finally:
+        await client.close()